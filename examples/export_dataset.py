@@ -0,0 +1,44 @@
+import os
+import re
+import shutil
+from concurrent.futures import ThreadPoolExecutor
+
+# Only the raw frames and the spectrometer export are needed downstream
+EXPORT_PATTERN = re.compile(r"(_frame\.npy|spectrum\.csv)$")
+
+
+def collect_copy_pairs(src_root: str, dst_root: str) -> list[tuple[str, str]]:
+    """
+    Collects the (source, destination) file pairs for the export.
+    Uses os.scandir so directory and file checks come from the cached
+    DirEntry objects instead of extra stat calls per path.
+
+    Arguments:
+        src_root -- Path to the root directory of the dataset
+        dst_root -- Path the dataset should be exported to
+
+    Returns:
+        List of (source file, destination file) tuples
+    """
+    pairs = []
+    with os.scandir(src_root) as root_it:
+        for folder in root_it:
+            if not folder.is_dir() or folder.name.startswith("."):
+                continue
+            dst_folder = os.path.join(dst_root, folder.name)
+            os.makedirs(dst_folder, exist_ok=True)
+            with os.scandir(folder.path) as folder_it:
+                for entry in folder_it:
+                    if entry.is_file() and EXPORT_PATTERN.search(entry.name):
+                        pairs.append((entry.path, os.path.join(dst_folder, entry.name)))
+    return pairs
+
+
+if __name__ == "__main__":
+    pairs = collect_copy_pairs("path/to/data", "path/to/export")
+    # shutil.copyfile already uses sendfile on Linux; the thread pool overlaps
+    # the many small per-file copies on top of that
+    with ThreadPoolExecutor(max_workers=32) as executor:
+        for _ in executor.map(lambda pair: shutil.copyfile(*pair), pairs):
+            pass
+    print(f"Exported {len(pairs)} files")
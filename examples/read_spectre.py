@@ -11,5 +11,5 @@ if __name__ == "__main__":
         cache=True,
         augment=True,
     )
-    dataset_l = list(dataset)
-    print(len(dataset_l))
+    frames, spectra = dataset.materialize(batch=64)
+    print(len(frames))
@@ -1,12 +1,64 @@
+import functools
+import json
 import os
-import pickle
+import queue
+import threading
 from collections.abc import Generator
+from concurrent.futures import ThreadPoolExecutor
 
 import numpy as np
 
 import spectre.utils as ut
 
 
+class PairIndex:
+    """
+    Lazy index over all (possibly augmented) samples of the dataset.
+    Instead of materializing the full Cartesian product of measurement folders
+    (O(N^2) tuples held in memory), only the folder list is stored and the
+    path tuple for a sample index is decoded on demand.
+    The sample order matches the previously materialized list: all singular
+    samples first, then the half-by-half product, then the squared samples.
+    """
+
+    def __init__(self, folders: list[str], augment: bool = True) -> None:
+        """
+        Arguments:
+            folders -- paths to all raw measurement folders
+
+        Keyword Arguments:
+            augment -- Flag if the physics informed augmentation should be used (default: {True})
+        """
+        self.folders = folders
+        self.augment = augment
+        self._n = len(folders)
+        # The augmentation multiplies one half of the dataset with the other
+        # half, plus every measurement with itself
+        self._n_b = self._n - self._n // 2
+        self._n_pairs = (self._n // 2) * self._n_b if augment else 0
+        self._n_squared = self._n if augment else 0
+
+    def __len__(self) -> int:
+        return self._n + self._n_pairs + self._n_squared
+
+    def __getitem__(self, index: int) -> tuple[str, str]:
+        if index < 0:
+            index += len(self)
+        if index < 0 or index >= len(self):
+            raise IndexError("sample index out of range")
+        if index < self._n:
+            # Non-augmented sample
+            return self.folders[index], None
+        index -= self._n
+        if index < self._n_pairs:
+            # Sample from the half-by-half product
+            idx_a, idx_b = divmod(index, self._n_b)
+            return self.folders[idx_a], self.folders[self._n // 2 + idx_b]
+        # Sample multiplied with itself
+        index -= self._n_pairs
+        return self.folders[index], self.folders[index]
+
+
 class SPECTRE(Generator):
     def __init__(
         self,
@@ -21,7 +73,12 @@ class SPECTRE(Generator):
     ) -> None:
         """
         Main class to read and pre-process the SPECTRE dataset.
-        Use objects from this class as is (generator) or cast it to a list to have the whole dataset in memory
+        Use objects from this class as is (generator), or use materialize() /
+        iter_prefetched() to load the whole dataset into memory.
+        Do not cast the generator to a list: send() yields augmented samples as
+        views into reused scratch buffers, so the list entries would all alias
+        the last augmented sample. materialize() and iter_prefetched() return
+        owned arrays
 
         Arguments:
             root_dir -- Path to the root directory of the dataset
@@ -46,10 +103,14 @@ class SPECTRE(Generator):
         self.augment = augment
         self.shuffle = shuffle
 
-        # Initializing dataset
+        # Initializing dataset. The reference measurements are read lazily:
+        # cleaning only needs the spectra, the (much larger) reference frames
+        # are first touched when samples are actually read
         self._ids = None
         self.i = 0
-        self.dark_meas, self.white_meas = self._read_reference()
+        # Scratch buffers for the augmented multiply, sized on first use
+        self._frame_buf = None
+        self._spec_buf = None
         self.meas_list = self._scan_root()
         self.num_meas = len(self)
 
@@ -61,7 +122,11 @@ class SPECTRE(Generator):
 
     def send(self, _) -> tuple[np.ndarray, np.ndarray]:
         """
-        Overwrites the abstract function from the Generator Class
+        Overwrites the abstract function from the Generator Class.
+        For augmented samples the returned arrays are views into scratch
+        buffers that are overwritten by the next augmented sample - copy them
+        if they need to outlive the iteration step, or use materialize() to
+        get the whole dataset as owned arrays.
 
         Raises:
             StopIteration: If all measurements have been used
@@ -70,47 +135,158 @@ class SPECTRE(Generator):
             Next dataset item as a Tuple of (CSS Frame, GT Spectrum)
         """
         if self.i < len(self):
-            next_value = self._read_meas_file(self.i)
+            next_value = self._read_meas_file(self._ids[self.i])
             self.i += 1
             return next_value
         else:
             raise StopIteration
 
+    def materialize(self, batch: int = 64) -> tuple[np.ndarray, np.ndarray]:
+        """
+        Reads the whole dataset into memory as two stacked arrays.
+        This is faster than casting the generator to a list: the raw files are
+        read in parallel batches and the normalization and augmentation run
+        vectorized over whole batches instead of one sample at a time.
+
+        Keyword Arguments:
+            batch -- number of samples that are read and normalized together (default: {64})
+
+        Returns:
+            Dataset as tuple of (CSS Frames, GT Spectra) with a leading sample axis
+        """
+        num_meas = len(self)
+        frames = None
+        spectra = None
+        with ThreadPoolExecutor(max_workers=32) as executor:
+            for start in range(0, num_meas, batch):
+                ids = self._ids[start : start + batch]
+                raw = list(executor.map(self._read_meas_file_raw, ids))
+                frame_batch = ut.normalize_precomputed(
+                    np.stack([r[0] for r in raw]), self._frame_dark, self._frame_inv
+                )
+                spec_batch = ut.normalize_precomputed(
+                    np.stack([r[1] for r in raw]), self._spec_dark, self._spec_inv
+                )
+                # Augmented samples are multiplied with their partner measurement
+                paired = [j for j, r in enumerate(raw) if r[2] is not None]
+                if paired:
+                    frame_batch[paired] *= ut.normalize_precomputed(
+                        np.stack([raw[j][2] for j in paired]), self._frame_dark, self._frame_inv
+                    )
+                    spec_batch[paired] *= ut.normalize_precomputed(
+                        np.stack([raw[j][3] for j in paired]), self._spec_dark, self._spec_inv
+                    )
+                if frames is None:
+                    frames = np.empty((num_meas, *frame_batch.shape[1:]), dtype=np.float32)
+                    spectra = np.empty((num_meas, *spec_batch.shape[1:]), dtype=np.float32)
+                frames[start : start + len(ids)] = frame_batch
+                spectra[start : start + len(ids)] = spec_batch
+        return frames, spectra
+
+    def iter_prefetched(
+        self, depth: int = 4
+    ) -> Generator[tuple[np.ndarray, np.ndarray], None, None]:
+        """
+        Iterates the dataset with a background worker thread that reads ahead.
+        The file reads release the GIL, so they overlap with whatever the
+        consumer does with the samples, hiding the I/O latency behind the
+        compute. Unlike send(), augmented samples are yielded as owned copies,
+        so they can safely be kept across iteration steps. Read errors from
+        the worker are re-raised in the consumer.
+
+        Keyword Arguments:
+            depth -- maximum number of samples read ahead (default: {4})
+
+        Returns:
+            Generator over the dataset items as Tuples of (CSS Frame, GT Spectrum)
+        """
+        len(self)  # Ensures the dataset is initialized before the worker starts
+        prefetch_queue = queue.Queue(maxsize=depth)
+        sentinel = object()
+        stop = threading.Event()
+
+        def _put(item) -> bool:
+            # Bounded put that gives up once the consumer is gone, so an
+            # abandoned generator never leaves the worker blocked forever
+            while not stop.is_set():
+                try:
+                    prefetch_queue.put(item, timeout=0.1)
+                    return True
+                except queue.Full:
+                    pass
+            return False
+
+        def _worker():
+            try:
+                for sample_id in self._ids:
+                    frame, spectrum = self._read_meas_file(sample_id)
+                    if frame is self._frame_buf:
+                        # Detach augmented samples from the reused scratch buffers
+                        frame, spectrum = frame.copy(), spectrum.copy()
+                    if not _put((frame, spectrum)):
+                        return
+            except Exception as error:
+                # Hand the exception to the consumer instead of dying silently
+                _put(error)
+            finally:
+                _put(sentinel)
+
+        worker = threading.Thread(target=_worker, daemon=True)
+        worker.start()
+        try:
+            while (item := prefetch_queue.get()) is not sentinel:
+                if isinstance(item, Exception):
+                    raise item
+                yield item
+        finally:
+            stop.set()
+            worker.join()
+
+    def _read_meas_file_raw(
+        self, index: int
+    ) -> tuple[np.ndarray, np.ndarray, np.ndarray, np.ndarray]:
+        """
+        Reads the raw (un-normalized) arrays for a measurement list entry
+
+        Arguments:
+            index -- Index in the file list
+
+        Returns:
+            Tuple of (Frame, Spectrum, partner Frame, partner Spectrum), with the
+            partner entries set to None for non-augmented samples
+        """
+        path_tuple = self.meas_list[index]
+        frame, spectrum = ut.read_measurement(path_tuple[0], self.int_time)
+        if path_tuple[1] is None:
+            return frame, spectrum, None, None
+        frame_b, spectrum_b = ut.read_measurement(path_tuple[1], self.int_time)
+        return frame, spectrum, frame_b, spectrum_b
+
     def throw(self, typ, val=None, tb=None):
         """
         Forwards throw exceptions to super class
         """
         super().throw(typ, val, tb)
 
-    def _scan_root(self) -> list[tuple[str, str]]:
+    def _scan_root(self) -> PairIndex:
         """
         Function that scans the root directory for measurements.
-        The measurement locations are stored in a list of tuples, with each tuple holding two paths.
+        Indexing the returned PairIndex yields a tuple of two paths.
         The two paths are needed for the data augmentation, so that two measurements can be combined into one.
         If the second item in the Tuple is None it indicates a sample without augmentation.
 
         Returns:
-            List of paths to all raw measurement folders
-        """
-        # Measurements without augmentation
-        raw_meas_list = [
-            (os.path.join(self.root_dir, f), None)
-            for f in os.listdir(self.root_dir)
-            if not f.startswith(".") and f not in ["Dark", "White"]
-        ]
-        if not self.augment:
-            return raw_meas_list
-        else:
-            # Include path to multiply (one half of the dataset with the other half)
-            multiplied_list = []
-            for meas_a in raw_meas_list[: len(raw_meas_list) // 2]:
-                for meas_b in raw_meas_list[len(raw_meas_list) // 2 :]:
-                    multiplied_list.append((meas_a[0], meas_b[0]))
-            # Include multiplication with itself
-            squared_list = [(meas[0], meas[0]) for meas in raw_meas_list]
-
-            # Add all list together for final potential samples
-            return raw_meas_list + multiplied_list + squared_list
+            PairIndex over all raw measurement folders
+        """
+        # scandir hands out DirEntry objects with the joined path cached, so
+        # no per-entry os.path.join or extra stat calls are needed
+        with os.scandir(self.root_dir) as it:
+            folders = [
+                entry.path
+                for entry in it
+                if not entry.name.startswith(".") and entry.name not in ["Dark", "White"]
+            ]
+        return PairIndex(folders, self.augment)
 
     def _init_dataset(self):
         """
@@ -119,59 +295,162 @@ class SPECTRE(Generator):
         """
         if self.cache_dir is None:
             self.cache_dir = ".spectre_cache/"
-        if os.path.exists(os.path.join(self.cache_dir, "dataset_cache.pickle")) and self.cache:
-            print(
-                "Found dataset cache at: .spectre_cache/dataset_cache.json, skipping data cleaning step"
-            )
-            with open(os.path.join(self.cache_dir, "dataset_cache.pickle"), "rb") as f:
-                self.meas_list = pickle.load(f)
+        cache_path = os.path.join(self.cache_dir, "dataset_cache.json")
+        ids_path = os.path.join(self.cache_dir, "kept_ids.npy")
+        cached = None
+        if os.path.exists(cache_path) and os.path.exists(ids_path) and self.cache:
+            with open(cache_path) as f:
+                cached = json.load(f)
+            # The kept ids are only valid for the augment setting they were
+            # cleaned with - a cache from the other setting would map the ids
+            # to different (or out of range) samples, so re-clean instead
+            if not isinstance(cached, dict) or cached.get("augment") != self.augment:
+                print("Found dataset cache with different augment setting, cleaning again")
+                cached = None
+        if cached is not None:
+            print(f"Found dataset cache at: {cache_path}, skipping data cleaning step")
+            # Rebuild the index from the cached folder list, so the cached ids
+            # stay valid even if the directory listing order changes
+            self.meas_list = PairIndex(cached["folders"], self.augment)
+            self._ids = np.load(ids_path).astype(np.int32, copy=False)
         else:
             print("Cleaning dataset, this might take a while")
             try:
                 os.mkdir(self.cache_dir)
             except FileExistsError:
                 pass
-            for meas in self.meas_list:
-                if meas[1] is None:
-                    # Non-augmented sample
-                    spectrum = ut.read_spectrum(meas[0])
-                    spectrum = ut.normalize_array(spectrum, self.dark_meas[1], self.white_meas[1])
-                else:
-                    # Augmented sample
-                    spectrum_a = ut.read_spectrum(meas[0])
-                    spectrum_a = ut.normalize_array(
-                        spectrum_a, self.dark_meas[1], self.white_meas[1]
-                    )
-                    spectrum_b = ut.read_spectrum(meas[1])
-                    spectrum_b = ut.normalize_array(
-                        spectrum_b, self.dark_meas[1], self.white_meas[1]
-                    )
-                    spectrum = spectrum_a * spectrum_b
-                mean_signal = np.mean(spectrum)
-                if mean_signal < self.clean_threshold:
-                    self.meas_list.remove(meas)
-            if self.cache:
-                print(
-                    "Data Cleaning finished, saving results to .spectre_cache/dataset_cache.pickle"
+            # Read and normalize every unique spectrum exactly once. The augmented
+            # combinations reuse the cached arrays, so cleaning needs O(N) reads
+            # instead of O(N^2). The reads are IO-bound and release the GIL, so
+            # they are dispatched through a thread pool
+            folders = self.meas_list.folders
+            with ThreadPoolExecutor(max_workers=32) as executor:
+                norm_cache = dict(
+                    zip(folders, executor.map(self._load_normalized_spectrum, folders))
                 )
-                with open(os.path.join(self.cache_dir, "dataset_cache.pickle"), "wb") as f:
-                    pickle.dump(self.meas_list, f, pickle.HIGHEST_PROTOCOL)
-        self._ids = np.arange(len(self.meas_list))
+            mean_cache = {path: spectrum.mean() for path, spectrum in norm_cache.items()}
+            self._ids = np.array(
+                [
+                    i
+                    for i in range(len(self.meas_list))
+                    if self._pair_mean(self.meas_list[i], norm_cache, mean_cache)
+                    >= self.clean_threshold
+                ],
+                dtype=np.int32,
+            )
+            if self.cache:
+                print(f"Data Cleaning finished, saving results to {cache_path}")
+                with open(cache_path, "w") as f:
+                    json.dump({"folders": folders, "augment": self.augment}, f)
+                np.save(ids_path, self._ids)
         if self.shuffle:
-            np.random.shuffle(self._ids)
+            # int32 ids halve the bytes shuffled compared to the default int64
+            np.random.default_rng().shuffle(self._ids)
 
-    def _read_reference(
-        self,
-    ) -> tuple[tuple[np.ndarray, np.ndarray], tuple[np.ndarray, np.ndarray]]:
+    def _load_normalized_spectrum(self, path: str) -> np.ndarray:
         """
-        Reads the reference measurements from the root dir
+        Reads the GT spectrum from a measurement folder and normalizes it
+
+        Arguments:
+            path -- path to measurement
 
         Returns:
-            dark and whiten measurements
+            normalized spectrum
+        """
+        spectrum = ut.read_spectrum(path)
+        return ut.normalize_precomputed(spectrum, self._spec_dark, self._spec_inv)
+
+    @staticmethod
+    def _pair_mean(meas: tuple[str, str], norm_cache: dict, mean_cache: dict) -> float:
+        """
+        Computes the average signal strength of a (possibly augmented) sample
+        from the cached normalized spectra
+
+        Arguments:
+            meas -- measurement path tuple from the measurement list
+            norm_cache -- normalized spectrum per measurement folder
+            mean_cache -- mean of the normalized spectrum per measurement folder
+
+        Returns:
+            mean signal strength of the sample
+        """
+        if meas[1] is None:
+            # Non-augmented sample
+            return mean_cache[meas[0]]
+        else:
+            # Augmented sample
+            return np.mean(norm_cache[meas[0]] * norm_cache[meas[1]])
+
+    @functools.cached_property
+    def dark_meas(self) -> tuple[np.ndarray, np.ndarray]:
+        """
+        Dark reference measurement as tuple (Frame, Spectrum), read on first access
         """
-        dark = ut.read_measurement(os.path.join(self.root_dir, "Dark"))
-        white = ut.read_measurement(os.path.join(self.root_dir, "White"))
-        return dark, white
+        return ut.read_measurement(os.path.join(self.root_dir, "Dark"))
+
+    @functools.cached_property
+    def white_meas(self) -> tuple[np.ndarray, np.ndarray]:
+        """
+        White reference measurement as tuple (Frame, Spectrum), read on first access
+        """
+        return ut.read_measurement(os.path.join(self.root_dir, "White"))
+
+    @functools.cached_property
+    def _frame_refs(self) -> tuple[np.ndarray, np.ndarray]:
+        """
+        Precomputed (dark, 1 / (white - dark)) for frame normalization, so the
+        per-sample kernel is a single subtract and multiply instead of
+        recomputing (white - dark). Stored as contiguous float32 so the
+        numpy/numba kernels get SIMD-friendly strides. Only read when samples
+        are iterated or materialized
+        """
+        dark = ut.read_frame(os.path.join(self.root_dir, "Dark"))
+        white = ut.read_frame(os.path.join(self.root_dir, "White"))
+        return self._precompute_refs(dark, white)
+
+    @functools.cached_property
+    def _spec_refs(self) -> tuple[np.ndarray, np.ndarray]:
+        """
+        Precomputed (dark, 1 / (white - dark)) for spectrum normalization.
+        Read on first access, which happens during dataset cleaning
+        """
+        dark = ut.read_spectrum(os.path.join(self.root_dir, "Dark"))
+        white = ut.read_spectrum(os.path.join(self.root_dir, "White"))
+        return self._precompute_refs(dark, white)
+
+    @staticmethod
+    def _precompute_refs(dark: np.ndarray, white: np.ndarray) -> tuple[np.ndarray, np.ndarray]:
+        """
+        Builds the contiguous float32 (dark, inverse range) pair for
+        normalize_precomputed from a dark and white reference
+
+        Arguments:
+            dark -- dark reference array
+            white -- white reference array
+
+        Returns:
+            Tuple of (dark, 1 / (white - dark))
+        """
+        return (
+            np.ascontiguousarray(dark, dtype=np.float32),
+            np.ascontiguousarray(1.0 / np.clip(white - dark, ut.EPSILON, None), dtype=np.float32),
+        )
+
+    @property
+    def _frame_dark(self) -> np.ndarray:
+        return self._frame_refs[0]
+
+    @property
+    def _frame_inv(self) -> np.ndarray:
+        return self._frame_refs[1]
+
+    @property
+    def _spec_dark(self) -> np.ndarray:
+        return self._spec_refs[0]
+
+    @property
+    def _spec_inv(self) -> np.ndarray:
+        return self._spec_refs[1]
 
     def _read_meas_file(self, index: int) -> tuple[np.ndarray, np.ndarray]:
         """
@@ -189,10 +468,23 @@ class SPECTRE(Generator):
             # No multiplication necessary
             return self._read_meas_file_singular(path_tuple[0])
         else:
-            # Sample is augmented (multiplication of two samples)
-            frame_a, spectrum_a = self._read_meas_file_singular(path_tuple[0])
-            frame_b, spectrum_b = self._read_meas_file_singular(path_tuple[1])
-            return frame_a * frame_b, spectrum_a * spectrum_b
+            # Sample is augmented (multiplication of two samples). The raw
+            # arrays go through the fused pair kernel instead of being
+            # normalized separately and multiplied afterwards. The results are
+            # written into reused scratch buffers to avoid two frame-sized
+            # allocations per sample
+            frame_a, spectrum_a = ut.read_measurement(path_tuple[0], self.int_time)
+            frame_b, spectrum_b = ut.read_measurement(path_tuple[1], self.int_time)
+            if self._frame_buf is None or self._frame_buf.shape != frame_a.shape:
+                self._frame_buf = np.empty(frame_a.shape, dtype=np.float32)
+                self._spec_buf = np.empty(spectrum_a.shape, dtype=np.float32)
+            frame = ut.normalize_pair(
+                frame_a, frame_b, self._frame_dark, self._frame_inv, out=self._frame_buf
+            )
+            spectrum = ut.normalize_pair(
+                spectrum_a, spectrum_b, self._spec_dark, self._spec_inv, out=self._spec_buf
+            )
+            return frame, spectrum
 
     def _read_meas_file_singular(self, path) -> tuple[np.ndarray, np.ndarray]:
         """
@@ -221,6 +513,6 @@ class SPECTRE(Generator):
         Returns:
             normalized measurement tuple (Frame, Spectrum)
         """
-        frame_norm = ut.normalize_array(frame, self.dark_meas[0], self.white_meas[0])
-        spectrum_norm = ut.normalize_array(spectrum, self.dark_meas[1], self.white_meas[1])
+        frame_norm = ut.normalize_precomputed(frame, self._frame_dark, self._frame_inv)
+        spectrum_norm = ut.normalize_precomputed(spectrum, self._spec_dark, self._spec_inv)
         return frame_norm, spectrum_norm